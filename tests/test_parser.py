@@ -1,6 +1,13 @@
-import json
+import mmap
 import os
-from typing import Callable
+import sys
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
+from typing import Any, Callable
+
+import orjson
+import pytest
 
 from twscrape import API, gather
 from twscrape.logger import set_log_level
@@ -10,163 +17,247 @@ BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "mocked-data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-set_log_level("DEBUG")
+# filename -> full path, listed once for the whole module
+_FIXTURES: dict[str, str] = {
+    x.name: x.path for x in os.scandir(DATA_DIR) if x.is_file() and x.name.endswith(".json")
+}
+
+# parsers log every tweet on DEBUG, keep it quiet unless asked for
+LOG_LEVEL = os.environ.get("TWSCRAPE_TEST_LOG", "WARNING").upper()
+set_log_level(LOG_LEVEL)  # type: ignore
+
+
+@pytest.fixture
+def debug_logs():
+    set_log_level("DEBUG")
+    yield
+    set_log_level(LOG_LEVEL)  # type: ignore
 
 
 class FakeRep:
-    text: str
+    _obj: Any
 
-    def __init__(self, text: str):
-        self.text = text
+    def __init__(self, obj: Any):
+        self._obj = obj
 
     def json(self):
-        return json.loads(self.text)
+        # parsers treat response as read-only, so the cached object is shared
+        return self._obj
+
+
+@lru_cache(maxsize=None)
+def _load_fixture(filename: str) -> Any:
+    # parse straight from the mapped file, result is cached so the map is closed right away
+    with open(filename, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as buf:
+            return orjson.loads(buf)
 
 
 def fake_rep(filename: str):
     filename = filename if filename.endswith(".json") else f"{filename}.json"
+    if filename in _FIXTURES:
+        return FakeRep(_load_fixture(_FIXTURES[filename]))
+
     filename = filename if filename.startswith("/") else os.path.join(DATA_DIR, filename)
+    return FakeRep(_load_fixture(filename))
+
+
+@pytest.fixture(scope="session")
+def mocked_data() -> dict[str, Any]:
+    return {k.removesuffix(".json"): _load_fixture(v) for k, v in _FIXTURES.items()}
 
-    with open(filename) as fp:
-        return FakeRep(fp.read())
 
+class _AsyncRep:
+    def __init__(self, rep: FakeRep):
+        self.rep = rep
 
-def mock_rep(fn: Callable, filename: str, as_generator=False):
-    rep = fake_rep(filename)
+    async def __call__(self, *args, **kwargs):
+        return self.rep
 
-    async def cb_rep(*args, **kwargs):
-        return rep
 
-    async def cb_gen(*args, **kwargs):
-        yield rep
+class _AsyncGen(_AsyncRep):
+    async def __call__(self, *args, **kwargs):  # pyright: ignore
+        yield self.rep
 
+
+def mock_rep(fn: Callable, data: str | dict, as_generator=False):
     assert "__self__" in dir(fn)
-    cb = cb_gen if as_generator else cb_rep
-    cb.__name__ = fn.__name__
+    rep = FakeRep(data) if isinstance(data, dict) else fake_rep(data)
+    cb = (_AsyncGen if as_generator else _AsyncRep)(rep)
+    cb.__name__ = fn.__name__  # pyright: ignore
     cb.__self__ = fn.__self__  # pyright: ignore
     setattr(fn.__self__, fn.__name__, cb)  # pyright: ignore
 
 
-def check_tweet(doc: Tweet | None):
-    assert doc is not None
-    assert isinstance(doc.id, int)
-    assert isinstance(doc.id_str, str)
-    assert str(doc.id) == doc.id_str
+def reset_mocks(obj: object):
+    # mocks shadow class methods as instance attributes, dropping them restores originals
+    for k in [k for k, v in vars(obj).items() if isinstance(v, _AsyncRep)]:
+        delattr(obj, k)
 
-    assert doc.url is not None
-    assert doc.id_str in doc.url
-    assert doc.user is not None
 
-    assert isinstance(doc.conversationId, int)
-    assert isinstance(doc.conversationIdStr, str)
-    assert str(doc.conversationId) == doc.conversationIdStr
+@pytest.fixture(scope="session")
+def _shared_api():
+    return API()
 
-    if doc.inReplyToTweetId is not None:
-        assert isinstance(doc.inReplyToTweetId, int)
-        assert isinstance(doc.inReplyToTweetIdStr, str)
-        assert str(doc.inReplyToTweetId) == doc.inReplyToTweetIdStr
 
-    if doc.inReplyToUser:
-        check_user_ref(doc.inReplyToUser)
+@pytest.fixture
+def api(_shared_api: API):
+    yield _shared_api
+    reset_mocks(_shared_api)
 
-    if doc.mentionedUsers:
-        for x in doc.mentionedUsers:
-            check_user_ref(x)
 
-    obj = doc.dict()
-    assert doc.id == obj["id"]
-    assert doc.id_str == obj["id_str"]
-    assert doc.user.id == obj["user"]["id"]
+_TWEET_TYPE = sys.intern("snscrape.modules.twitter.Tweet")
+_USER_TYPE = sys.intern("snscrape.modules.twitter.User")
 
-    assert "url" in obj
-    assert "_type" in obj
-    assert obj["_type"] == "snscrape.modules.twitter.Tweet"
+# (int attr, str attr, optional)
+_TWEET_INT_STR_PAIRS = [
+    ("id", "id_str", False),
+    ("conversationId", "conversationIdStr", False),
+    ("inReplyToTweetId", "inReplyToTweetIdStr", True),
+]
 
-    assert "url" in obj["user"]
-    assert "_type" in obj["user"]
-    assert obj["user"]["_type"] == "snscrape.modules.twitter.User"
+_USER_INT_STR_PAIRS = [("id", "id_str", False)]
 
-    txt = doc.json()
-    assert isinstance(txt, str)
-    assert str(doc.id) in txt
-
-    if doc.media is not None:
-        if len(doc.media.photos) > 0:
-            assert doc.media.photos[0].url is not None
-
-        if len(doc.media.videos) > 0:
-            for x in doc.media.videos:
-                assert x.thumbnailUrl is not None
-                assert x.duration is not None
-                for v in x.variants:
-                    assert v.url is not None
-                    assert v.bitrate is not None
-                    assert v.contentType is not None
-
-    if doc.retweetedTweet is not None:
+
+def _pairs_getter(pairs: list[tuple[str, str, bool]]):
+    return attrgetter(*chain.from_iterable((a, b) for a, b, _ in pairs))
+
+
+_get_tweet_ids = _pairs_getter(_TWEET_INT_STR_PAIRS)
+_get_user_ids = _pairs_getter(_USER_INT_STR_PAIRS)
+
+_get_tweet_fields = attrgetter(
+    "url",
+    "user",
+    "inReplyToUser",
+    "mentionedUsers",
+    "media",
+    "retweetedTweet",
+    "rawContent",
+)
+
+
+def check_int_str_pairs(values: tuple, pairs: list[tuple[str, str, bool]]):
+    for (a, b, optional), va, vb in zip(pairs, values[::2], values[1::2], strict=True):
+        if optional and va is None:
+            continue
+
+        assert isinstance(va, int), f"{a} should be int"
+        assert isinstance(vb, str), f"{b} should be str"
+        assert va == int(vb), f"{a} and {b} should match"
+
+
+def check_tweet(doc: Tweet | None, deep=True):
+    assert doc is not None
+    ids = _get_tweet_ids(doc)
+    check_int_str_pairs(ids, _TWEET_INT_STR_PAIRS)
+    tid, tid_str = ids[0], ids[1]
+    url, user, reply_user, mentioned, media, rt, raw_content = _get_tweet_fields(doc)
+
+    assert url is not None
+    assert tid_str in url
+    assert user is not None
+    user_id = user.id
+
+    if reply_user:
+        check_user_ref(reply_user)
+
+    if mentioned:
+        for x in mentioned:
+            check_user_ref(x)
+
+    # serialization round-trip is the same for docs of one shape, so it can be skipped
+    if deep:
+        obj = doc.dict()
+        assert tid == obj["id"]
+        assert tid_str == obj["id_str"]
+        assert user_id == obj["user"]["id"]
+        assert user.username == obj["user"]["username"]
+
+        assert "url" in obj
+        assert "_type" in obj
+        assert obj["_type"] == _TWEET_TYPE
+
+        assert "url" in obj["user"]
+        assert "_type" in obj["user"]
+        assert obj["user"]["_type"] == _USER_TYPE
+
+        txt = doc.json()
+        assert isinstance(txt, str)
+        assert tid_str in txt
+
+    if media is not None:
+        if len(media.photos) > 0:
+            assert media.photos[0].url is not None
+
+        videos = media.videos
+        assert all(x.thumbnailUrl is not None and x.duration is not None for x in videos)
+        variants = chain.from_iterable(x.variants for x in videos)
+        assert all(
+            v.url is not None and v.bitrate is not None and v.contentType is not None
+            for v in variants
+        )
+
+    if rt is not None:
         try:
-            assert doc.rawContent.endswith(doc.retweetedTweet.rawContent), "content should be full"
+            assert raw_content.endswith(rt.rawContent), "content should be full"
         except AssertionError as e:
             print("\n" + "-" * 60)
-            print(doc.url)
-            print("1:", doc.rawContent)
-            print("2:", doc.retweetedTweet.rawContent)
+            print(url)
+            print("1:", raw_content)
+            print("2:", rt.rawContent)
             print("-" * 60)
             raise e
 
-    check_user(doc.user)
+    # user is already serialized as part of the tweet above
+    check_user(user, deep=False)
 
 
-def check_user(doc: User):
-    assert doc.id is not None
-    assert isinstance(doc.id, int)
-    assert isinstance(doc.id_str, str)
-    assert str(doc.id) == doc.id_str
+def check_user(doc: User, deep=True):
+    ids = _get_user_ids(doc)
+    uid, uid_str = ids
+    assert uid is not None
+    check_int_str_pairs(ids, _USER_INT_STR_PAIRS)
 
-    assert doc.username is not None
-    assert doc.descriptionLinks is not None
+    username, links = doc.username, doc.descriptionLinks
+    assert username is not None
+    assert links is not None
 
-    if len(doc.descriptionLinks) > 0:
-        for x in doc.descriptionLinks:
-            assert x.url is not None
-            assert x.text is not None
-            assert x.tcourl is not None
+    assert all(x.url is not None and x.text is not None and x.tcourl is not None for x in links)
 
-    obj = doc.dict()
-    assert doc.id == obj["id"]
-    assert doc.username == obj["username"]
+    if deep:
+        obj = doc.dict()
+        assert uid == obj["id"]
+        assert username == obj["username"]
 
-    txt = doc.json()
-    assert isinstance(txt, str)
-    assert str(doc.id) in txt
+        txt = doc.json()
+        assert isinstance(txt, str)
+        assert uid_str in txt
 
 
 def check_user_ref(doc: UserRef):
-    assert isinstance(doc.id, int)
-    assert isinstance(doc.id_str, str)
-    assert str(doc.id) == doc.id_str
+    ids = _get_user_ids(doc)
+    check_int_str_pairs(ids, _USER_INT_STR_PAIRS)
 
     assert doc.username is not None
     assert doc.displayname is not None
 
     obj = doc.dict()
-    assert doc.id == obj["id"]
-    assert doc.id_str == obj["id_str"]
+    assert ids[0] == obj["id"]
+    assert ids[1] == obj["id_str"]
 
 
-async def test_search():
-    api = API()
+async def test_search(api: API):
     mock_rep(api.search_raw, "raw_search", as_generator=True)
 
     items = await gather(api.search("elon musk lang:en", limit=20))
     assert len(items) > 0
 
-    for doc in items:
-        check_tweet(doc)
+    for i, doc in enumerate(items):
+        check_tweet(doc, deep=i == 0)
 
 
-async def test_user_by_id():
-    api = API()
+async def test_user_by_id(api: API):
     mock_rep(api.user_by_id_raw, "raw_user_by_id")
 
     doc = await api.user_by_id(2244994945)
@@ -180,11 +271,10 @@ async def test_user_by_id():
 
     txt = doc.json()
     assert isinstance(txt, str)
-    assert str(doc.id) in txt
+    assert doc.id_str in txt
 
 
-async def test_user_by_login():
-    api = API()
+async def test_user_by_login(api: API):
     mock_rep(api.user_by_login_raw, "raw_user_by_login")
 
     doc = await api.user_by_login("xdevelopers")
@@ -198,11 +288,10 @@ async def test_user_by_login():
 
     txt = doc.json()
     assert isinstance(txt, str)
-    assert str(doc.id) in txt
+    assert doc.id_str in txt
 
 
-async def test_tweet_details():
-    api = API()
+async def test_tweet_details(api: API):
     mock_rep(api.tweet_details_raw, "raw_tweet_details")
 
     doc = await api.tweet_details(1649191520250245121)
@@ -213,147 +302,133 @@ async def test_tweet_details():
     assert doc.user is not None, "tweet.user should not be None"
 
 
-async def test_tweet_replies():
-    api = API()
+async def test_tweet_replies(api: API):
     mock_rep(api.tweet_replies_raw, "raw_tweet_replies", as_generator=True)
 
     twid = 1649191520250245121
     tweets = await gather(api.tweet_replies(twid, limit=20))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
         assert doc.inReplyToTweetId == twid
 
 
-async def test_followers():
-    api = API()
+async def test_followers(api: API):
     mock_rep(api.followers_raw, "raw_followers", as_generator=True)
 
     users = await gather(api.followers(2244994945))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
 
 
-async def test_verified_followers():
-    api = API()
+async def test_verified_followers(api: API):
     mock_rep(api.verified_followers_raw, "raw_verified_followers", as_generator=True)
 
     users = await gather(api.verified_followers(2244994945))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
         assert doc.blue is True, "snould be only Blue users"
 
 
-async def test_subscriptions():
-    api = API()
+async def test_subscriptions(api: API):
     mock_rep(api.subscriptions_raw, "raw_subscriptions", as_generator=True)
 
     users = await gather(api.subscriptions(44196397))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
 
 
-async def test_following():
-    api = API()
+async def test_following(api: API):
     mock_rep(api.following_raw, "raw_following", as_generator=True)
 
     users = await gather(api.following(2244994945))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
 
 
-async def test_retweters():
-    api = API()
+async def test_retweters(api: API):
     mock_rep(api.retweeters_raw, "raw_retweeters", as_generator=True)
 
     users = await gather(api.retweeters(1649191520250245121))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
 
 
-async def test_favoriters():
-    api = API()
+async def test_favoriters(api: API):
     mock_rep(api.favoriters_raw, "raw_favoriters", as_generator=True)
 
     users = await gather(api.favoriters(1649191520250245121))
     assert len(users) > 0
 
-    for doc in users:
-        check_user(doc)
+    for i, doc in enumerate(users):
+        check_user(doc, deep=i == 0)
 
 
-async def test_user_tweets():
-    api = API()
+async def test_user_tweets(api: API):
     mock_rep(api.user_tweets_raw, "raw_user_tweets", as_generator=True)
 
     tweets = await gather(api.user_tweets(2244994945))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
 
 
-async def test_user_tweets_and_replies():
-    api = API()
+async def test_user_tweets_and_replies(api: API):
     mock_rep(api.user_tweets_and_replies_raw, "raw_user_tweets_and_replies", as_generator=True)
 
     tweets = await gather(api.user_tweets_and_replies(2244994945))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
 
 
-async def test_raw_user_media():
-    api = API()
+async def test_raw_user_media(api: API):
     mock_rep(api.user_media_raw, "raw_user_media", as_generator=True)
 
     tweets = await gather(api.user_media(2244994945))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
         assert doc.media is not None
         media_count = len(doc.media.photos) + len(doc.media.videos) + len(doc.media.animated)
         assert media_count > 0, f"{doc.url} should have media"
 
 
-async def test_list_timeline():
-    api = API()
+async def test_list_timeline(api: API):
     mock_rep(api.list_timeline_raw, "raw_list_timeline", as_generator=True)
 
     tweets = await gather(api.list_timeline(1494877848087187461))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
 
 
-async def test_likes():
-    api = API()
+async def test_likes(api: API):
     mock_rep(api.liked_tweets_raw, "raw_likes", as_generator=True)
 
     tweets = await gather(api.liked_tweets(2244994945))
     assert len(tweets) > 0
 
-    for doc in tweets:
-        check_tweet(doc)
-
+    for i, doc in enumerate(tweets):
+        check_tweet(doc, deep=i == 0)
 
-async def test_tweet_with_video():
-    api = API()
 
+async def test_tweet_with_video(api: API):
     files = [
         ("manual_tweet_with_video_1.json", 1671508600538161153),
         ("manual_tweet_with_video_2.json", 1671753569412820992),
@@ -366,10 +441,8 @@ async def test_tweet_with_video():
         check_tweet(doc)
 
 
-async def test_issue_28():
-    api = API()
-
-    mock_rep(api.tweet_details_raw, "_issue_28_1")
+async def test_issue_28(api: API, mocked_data: dict):
+    mock_rep(api.tweet_details_raw, mocked_data["_issue_28_1"])
     doc = await api.tweet_details(1658409412799737856)
     assert doc is not None
     check_tweet(doc)
@@ -383,7 +456,7 @@ async def test_issue_28():
     assert doc.viewCount == doc.retweetedTweet.viewCount
     check_tweet(doc.retweetedTweet)
 
-    mock_rep(api.tweet_details_raw, "_issue_28_2")
+    mock_rep(api.tweet_details_raw, mocked_data["_issue_28_2"])
     doc = await api.tweet_details(1658421690001502208)
     assert doc is not None
     check_tweet(doc)
@@ -396,8 +469,8 @@ async def test_issue_28():
     assert doc.quotedTweet.viewCount is not None
 
 
-async def test_issue_42():
-    raw = fake_rep("_issue_42").json()
+async def test_issue_42(mocked_data: dict):
+    raw = mocked_data["_issue_42"]
     doc = parse_tweet(raw, 1665951747842641921)
     assert doc is not None
     assert doc.retweetedTweet is not None
@@ -406,17 +479,18 @@ async def test_issue_42():
     assert doc.rawContent.endswith(doc.retweetedTweet.rawContent)
 
 
-async def test_issue_56():
-    raw = fake_rep("_issue_56").json()
+async def test_issue_56(mocked_data: dict):
+    raw = mocked_data["_issue_56"]
     doc = parse_tweet(raw, 1682072224013099008)
     assert doc is not None
-    assert len(set([x.tcourl for x in doc.links])) == len(doc.links)
-    assert len(doc.links) == 5
+    urls = [x.tcourl for x in doc.links]
+    assert len(urls) == 5
+    assert len(set(urls)) == len(urls)
 
 
-async def test_issue_72():
+async def test_issue_72(mocked_data: dict):
     # Check SummaryCard
-    raw = fake_rep("_issue_72").json()
+    raw = mocked_data["_issue_72"]
     doc = parse_tweet(raw, 1696922210588410217)
     assert doc is not None
     assert doc.card is not None
@@ -427,7 +501,7 @@ async def test_issue_72():
     assert doc.card.url is not None
 
     # Check PoolCard
-    raw = fake_rep("_issue_72_poll").json()
+    raw = mocked_data["_issue_72_poll"]
     doc = parse_tweet(raw, 1780666831310877100)
     assert doc is not None
     assert doc.card is not None